@@ -0,0 +1,122 @@
+import functools
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+from botocore.config import Config
+
+# Resolved VPC, route table and subnet IDs are shared across trait instances for a few
+# minutes so that toggling many workspaces (or re-running) does not repeat identical lookups.
+LOOKUP_CACHE_TTL_SECONDS = 300
+_lookup_cache: dict[tuple, tuple[float, str]] = {}
+_lookup_cache_lock = threading.Lock()
+
+# Most workspaces the bulk create/delete helpers toggle at once; their `max_workers` is capped to it
+BULK_MAX_WORKERS = 16
+# EC2 calls one workspace can have in flight: the route table and subnet lookups run
+# in parallel during init while CreateNATGateway allocates its Elastic IP
+EC2_CALLS_IN_FLIGHT_PER_WORKSPACE = 3
+
+# Size the shared client's connection pool for the bulk fan-out (botocore's default of 10
+# would discard connections and redo TLS handshakes), enable TCP keep-alive, and back off
+# adaptively when EC2 throttles
+EC2_CLIENT_CONFIG = Config(
+    max_pool_connections=BULK_MAX_WORKERS * EC2_CALLS_IN_FLIGHT_PER_WORKSPACE,
+    retries={'max_attempts': 10, 'mode': 'adaptive'},
+    tcp_keepalive=True,
+)
+
+
+@functools.lru_cache(maxsize=16)
+def ec2_client(profile_name: str, region_name: str):
+    """
+    Return a shared EC2 client for the profile and region; botocore clients are thread safe.
+    """
+    return boto3.Session(profile_name=profile_name).client('ec2', region_name=region_name, config=EC2_CLIENT_CONFIG)
+
+
+def _cached_lookup(key: tuple, lookup: Callable[[], str]) -> str:
+    """
+    Return a resource ID resolved by `lookup`, reusing a cached ID younger than the TTL.
+    Lookups that raise (no match or several matches) are not cached, and expired entries are evicted.
+    """
+    now = time.monotonic()
+    with _lookup_cache_lock:
+        for expired in [k for k, (cached_at, _) in _lookup_cache.items() if now - cached_at >= LOOKUP_CACHE_TTL_SECONDS]:
+            del _lookup_cache[expired]
+        if entry := _lookup_cache.get(key):
+            return entry[1]
+    resource_id = lookup()
+    with _lookup_cache_lock:
+        _lookup_cache[key] = (now, resource_id)
+    return resource_id
+
+
+class ToggleNATGatewayForDatabricksWorkspaceTrait:
+    """
+    Base class for managing NAT Gateway operations in a Databricks workspace VPC.
+    Handles initialization of AWS client and finding necessary AWS resources.
+    """
+    def __init__(self, profile_name: str, workspace_id: str, region_name: str = 'eu-central-1'):
+        """
+        Initialize the trait with AWS credentials and Databricks workspace information.
+        """
+        self.client = ec2_client(profile_name, region_name)
+        self._cache_key = (profile_name, region_name)
+        self.vpc_id = self._cached(self._find_vpc_id_by_name, workspace_id)
+        # The route table and NAT subnet lookups only depend on the VPC, so issue them together
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            route_table = executor.submit(self._cached, self._find_default_route_table_by_vpcid, self.vpc_id)
+            subnet_id_for_natgw = executor.submit(self._cached, self._find_subnet_id_for_natgw_by_vpc_id, self.vpc_id)
+            self.route_table = route_table.result()
+            self.subnet_id_for_natgw = subnet_id_for_natgw.result()
+
+    def _cached(self, find: Callable[[str], str], name: str) -> str:
+        """
+        Run one of the `_find_*` lookups through the shared cache for this profile and region.
+        """
+        return _cached_lookup((*self._cache_key, find.__name__, name), lambda: find(name))
+
+    def _find_vpc_id_by_name(self, workspace_id: str) -> str:
+        """
+        Find the VPC ID associated with the Databricks workspace.
+        """
+        filters = [
+            {"Name": "tag:Name", "Values": [f"*workerenv-{workspace_id}*"]},
+        ]
+        response = self.client.describe_vpcs(Filters=filters)
+        matched_vpcs = response['Vpcs']
+
+        if (cnt := len(matched_vpcs)) != 1:
+            raise ValueError(f"{'No' if not cnt else 'Multiple'} VPCs found with name containing workspace ID '{workspace_id}'")
+
+        return matched_vpcs[0]['VpcId']
+
+    def _find_default_route_table_by_vpcid(self, vpc_id: str) -> str:
+        """
+        Find the default route table for the given VPC.
+        """
+        filters = [
+            {"Name": "vpc-id", "Values": [vpc_id]},
+            {"Name": "association.main", "Values": ["true"]},
+        ]
+        response = self.client.describe_route_tables(Filters=filters)
+        return response["RouteTables"][0]["RouteTableId"]
+
+    def _find_subnet_id_for_natgw_by_vpc_id(self, vpc_id: str) -> str:
+        """
+        Find the subnet designated for NAT Gateway in a VPC.
+        """
+        filters = [
+            {"Name": "vpc-id", "Values": [vpc_id]},
+            {"Name": "tag:Name", "Values": ["*nat-gateway-subnet*"]},
+        ]
+        response = self.client.describe_subnets(Filters=filters)
+        matched_subnets = response['Subnets']
+
+        if (cnt := len(matched_subnets)) != 1:
+            raise ValueError(f"{'No' if not cnt else 'Multiple'} subnets found with name 'nat-gateway-subnet' in VPC '{vpc_id}'")
+
+        return matched_subnets[0]['SubnetId']
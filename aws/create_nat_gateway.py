@@ -1,68 +1,25 @@
+import logging
 import time
-import boto3
-from botocore.exceptions import ClientError
-
-class ToggleNATGatewayForDatabricksWorkspaceTrait:
-    """
-    Base class for managing NAT Gateway operations in a Databricks workspace VPC.
-    Handles initialization of AWS client and finding necessary AWS resources.
-    """
-    def __init__(self, profile_name: str, workspace_id: str, region_name: str = 'eu-west-1'):
-        """
-        Initialize the trait with AWS credentials and Databricks workspace information.
-        """
-        self.client = boto3.Session(profile_name=profile_name).client('ec2', region_name=region_name)
-        self.vpc_id = self._find_vpc_id_by_name(workspace_id)
-        self.route_table = self._find_default_route_table_by_vpcid(self.vpc_id)
-        self.subnet_id_for_natgw = self._find_subnet_id_for_natgw_by_vpc_id(self.vpc_id)
-
-    def _find_vpc_id_by_name(self, workspace_id: str) -> str:
-        """
-        Find the VPC ID associated with the Databricks workspace.
-        """
-        response = self.client.describe_vpcs()
-        matched_vpcs = []
-
-        for vpc in response['Vpcs']:
-            for tag in vpc.get('Tags', []):
-                if tag['Key'] == 'Name' and f'workerenv-{workspace_id}' in tag['Value']:
-                    matched_vpcs.append(vpc)
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-        if (cnt := len(matched_vpcs)) != 1:
-            raise ValueError(f"{cnt} VPCs found with name containing workspace ID '{workspace_id}'")
+from botocore.exceptions import ClientError
 
-        return matched_vpcs[0]['VpcId']
+from ._natgw_base import BULK_MAX_WORKERS, ToggleNATGatewayForDatabricksWorkspaceTrait, ec2_client
 
-    def _find_default_route_table_by_vpcid(self, vpc_id: str) -> str:
-        """
-        Find the default route table for the given VPC.
-        """ 
-        filters = [
-            {"Name": "vpc-id", "Values": [vpc_id]},
-            {"Name": "association.main", "Values": ["true"]},
-        ]
-        response = self.client.describe_route_tables(Filters=filters)
-        return response["RouteTables"][0]["RouteTableId"]
-
-    def _find_subnet_id_for_natgw_by_vpc_id(self, vpc_id: str) -> str:
-        """
-        Find the subnet designated for NAT Gateway in a VPC.
-        """     
-        filters = [
-            {"Name": "vpc-id", "Values": [vpc_id]},
-        ]
-        response = self.client.describe_subnets(Filters=filters)
-        matched_subnets = []
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
 
-        for subnet in response['Subnets']:
-            for tag in subnet.get('Tags', []):
-                if tag['Key'] == 'Name' and 'nat-gateway-subnet' in tag['Value']:
-                    matched_subnets.append(subnet)
 
-        if (cnt := len(matched_subnets)) != 1:
-            raise ValueError(f"{cnt} subnets found with name 'nat-gateway-subnet' in VPC '{vpc_id}'")
-
-        return matched_subnets[0]['SubnetId']
+def _is_missing_route_error(error: ClientError) -> bool:
+    """
+    Tell whether a route call failed because the route does not exist.
+    ReplaceRoute reports this as InvalidParameterValue ("There is no route defined ...")
+    rather than InvalidRoute.NotFound.
+    """
+    code = error.response['Error']['Code']
+    message = error.response['Error'].get('Message', '')
+    return code == 'InvalidRoute.NotFound' or (code == 'InvalidParameterValue' and 'no route defined' in message)
 
 
 class CreateNATGateway(ToggleNATGatewayForDatabricksWorkspaceTrait):
@@ -70,85 +27,123 @@ class CreateNATGateway(ToggleNATGatewayForDatabricksWorkspaceTrait):
     Class for creating and configuring a NAT Gateway in a Databricks workspace VPC.
     Inherits from ToggleNATGatewayForDatabricksWorkspaceTrait.
     """
-    def __init__(self, profile_name: str, workspace_id: str, region_name: str = 'eu-central-1'):
+    def __init__(self, profile_name: str, workspace_id: str, region_name: str = 'eu-central-1',
+                 executor: ThreadPoolExecutor | None = None):
         """
         Initialize the NAT Gateway creator.
+        The Elastic IP is allocated on `executor` (or a private thread) while the
+        workspace VPC resources are discovered, and released again if discovery fails.
+        """
+        client = ec2_client(profile_name, region_name)
+        if own_executor := executor is None:
+            executor = ThreadPoolExecutor(max_workers=1)
+        self._eip_future = executor.submit(client.allocate_address, Domain='vpc')
+        if own_executor:
+            executor.shutdown(wait=False)
+
+        try:
+            super().__init__(profile_name, workspace_id, region_name)
+        except Exception:
+            self._release_unused_eip(client)
+            raise
+
+    def _release_unused_eip(self, client):
+        """
+        Release the pre-allocated Elastic IP when the NAT Gateway will not be created.
+        Runs while another exception is propagating, so failures here are only logged.
         """
-        super().__init__(profile_name, workspace_id, region_name)
+        try:
+            allocation_id = self._eip_future.result()['AllocationId']
+        except Exception:
+            logger.warning("Elastic IP allocation did not succeed; nothing to release", exc_info=True)
+            return
+        try:
+            client.release_address(AllocationId=allocation_id)
+        except Exception:
+            logger.exception("Failed to release unused Elastic IP %s", allocation_id)
+            return
+        logger.info("Elastic IP %s released", allocation_id)
 
     def create_eip(self) -> str:
         """
-        Create an Elastic IP address for the NAT Gateway.
+        Return the Elastic IP address allocated for the NAT Gateway.
         """
-        response = self.client.allocate_address(Domain='vpc')
-        if response['ResponseMetadata']['HTTPStatusCode'] == 200:
-            print(f"Elastic IP {response['AllocationId']} created successfully")
-            return response['AllocationId']
-        else:
-            raise ValueError(f"Failed to create Elastic IP\n{response}")
+        try:
+            allocation_id = self._eip_future.result()['AllocationId']
+        except ClientError as e:
+            raise ValueError(f"Failed to create Elastic IP: {e}") from e
+        logger.info("Elastic IP %s created successfully", allocation_id)
+        return allocation_id
 
     def create_natgw(self, eip_association_id: str) -> str:
         """
         Create a NAT Gateway with the allocated Elastic IP.
         """
-        response = self.client.create_nat_gateway(
-            AllocationId=eip_association_id,
-            SubnetId=self.subnet_id_for_natgw
-        )
-        if response['ResponseMetadata']['HTTPStatusCode'] == 200:
-            print(f"NAT Gateway {response['NatGateway']['NatGatewayId']} created successfully")
-            return response['NatGateway']['NatGatewayId']
-        else:
-            raise ValueError(f"Failed to create NAT Gateway\n{response}")
-
-    def check_nat_gateway_status(self, nat_gateway_id: str) -> str:
+        try:
+            response = self.client.create_nat_gateway(
+                AllocationId=eip_association_id,
+                SubnetId=self.subnet_id_for_natgw
+            )
+        except ClientError as e:
+            raise ValueError(f"Failed to create NAT Gateway: {e}") from e
+        logger.info("NAT Gateway %s created successfully", response['NatGateway']['NatGatewayId'])
+        return response['NatGateway']['NatGatewayId']
+
+    def check_nat_gateway_status(self, nat_gateway_id: str, timeout: float = 600) -> None:
         """
         Check the NAT Gateway status until it becomes available.
+        Polls every second at first, backing off linearly to 10 seconds and then
+        exponentially up to 30 seconds, and gives up after `timeout` seconds.
         """
+        deadline = time.monotonic() + timeout
+        delay = 1
         while True:
             try:
                 response = self.client.describe_nat_gateways(NatGatewayIds=[nat_gateway_id])
                 nat_gateway = response['NatGateways'][0]
                 if nat_gateway['State'] == 'available':
-                    print(f"NAT Gateway {nat_gateway_id} is available.")
+                    logger.info("NAT Gateway %s is available.", nat_gateway_id)
                     return
                 elif nat_gateway['State'] == 'pending':
-                    print(f"NAT Gateway {nat_gateway_id} is still pending. Waiting...")
+                    logger.info("NAT Gateway %s is still pending. Waiting...", nat_gateway_id)
                 else:
                     raise ValueError(f"NAT Gateway {nat_gateway_id} is in an unexpected state: {nat_gateway['State']}")
             except ClientError as e:
-                raise ValueError(f"Failed to describe NAT Gateway {nat_gateway_id}: {e}")
+                raise ValueError(f"Failed to describe NAT Gateway {nat_gateway_id}: {e}") from e
 
-            time.sleep(30)  # Wait for 30 seconds before checking again
+            if (remaining := deadline - time.monotonic()) <= 0:
+                raise ValueError(f"NAT Gateway {nat_gateway_id} did not become available within {timeout} seconds")
+            time.sleep(min(delay, remaining))
+            delay = delay + 1 if delay < 10 else min(delay * 2, 30)
 
     def update_route_table(self, nat_gateway_id: str):
         """
         Update the route table to route all outbound traffic through the NAT Gateway.
-        First delete existing route if present, then create new route.
+        Replace the existing route in place, or create it if none is present.
         """
         try:
-            # Try to delete existing route if it exists
-            self.client.delete_route(
-                RouteTableId=self.route_table,
-                DestinationCidrBlock='0.0.0.0/0'
+            self.client.replace_route(
+                DestinationCidrBlock='0.0.0.0/0',
+                NatGatewayId=nat_gateway_id,
+                RouteTableId=self.route_table
             )
-            print(f"Deleted existing route for 0.0.0.0/0 from route table {self.route_table}")
+            logger.info("Route for 0.0.0.0/0 in route table %s now targets %s.", self.route_table, nat_gateway_id)
+            return
         except ClientError as e:
-            if 'InvalidRoute.NotFound' in str(e):
-                print(f"No existing route found for 0.0.0.0/0 in route table {self.route_table}")
-            else:
-                raise e
+            if not _is_missing_route_error(e):
+                raise ValueError(f"Failed to replace route in route table {self.route_table}: {e}") from e
+            logger.info("No existing route found for 0.0.0.0/0 in route table %s", self.route_table)
 
         # Create new route
-        response = self.client.create_route(
-            DestinationCidrBlock='0.0.0.0/0',
-            NatGatewayId=nat_gateway_id,
-            RouteTableId=self.route_table
-        )
-        if response['ResponseMetadata']['HTTPStatusCode'] == 200:
-            print(f"Route for 0.0.0.0/0 added to route table {self.route_table} successfully.")
-        else:
-            raise ValueError(f"Failed to add route to route table\n{response}")
+        try:
+            self.client.create_route(
+                DestinationCidrBlock='0.0.0.0/0',
+                NatGatewayId=nat_gateway_id,
+                RouteTableId=self.route_table
+            )
+        except ClientError as e:
+            raise ValueError(f"Failed to add route to route table {self.route_table}: {e}") from e
+        logger.info("Route for 0.0.0.0/0 added to route table %s successfully.", self.route_table)
 
     def run(self):
         """
@@ -165,12 +160,46 @@ class CreateNATGateway(ToggleNATGatewayForDatabricksWorkspaceTrait):
         return natgw_id
 
 
+def create_nat_gateways(profile_name: str, workspace_ids: list[str], region_name: str = 'eu-central-1',
+                        max_workers: int = 8) -> dict[str, str]:
+    """
+    Create NAT Gateways for several Databricks workspaces concurrently; duplicate IDs are only run once.
+    Returns a mapping of workspace ID to the created NAT Gateway ID. Every workspace is
+    attempted; if any fail, an ExceptionGroup is raised once all runs have finished, with
+    the mapping for the workspaces that succeeded attached as `nat_gateway_ids`.
+    `max_workers` is capped at BULK_MAX_WORKERS, the concurrency the shared EC2 client's
+    connection pool is sized for.
+    """
+    def run_for(workspace_id: str) -> str:
+        return CreateNATGateway(profile_name, workspace_id, region_name).run()
+
+    # Creating twice for the same workspace would leak a second NAT Gateway and Elastic IP
+    workspace_ids = list(dict.fromkeys(workspace_ids))
+    natgw_ids, errors = {}, []
+    with ThreadPoolExecutor(max_workers=min(max_workers, BULK_MAX_WORKERS)) as executor:
+        futures = {executor.submit(run_for, workspace_id): workspace_id for workspace_id in workspace_ids}
+        for future in as_completed(futures):
+            workspace_id = futures[future]
+            try:
+                natgw_ids[workspace_id] = future.result()
+            except Exception as e:
+                e.add_note(f"Workspace ID: {workspace_id}")
+                errors.append(e)
+
+    natgw_ids = {workspace_id: natgw_ids[workspace_id] for workspace_id in workspace_ids if workspace_id in natgw_ids}
+    if errors:
+        group = ExceptionGroup(f"Failed to create NAT Gateways for {len(errors)} of {len(workspace_ids)} workspaces", errors)
+        group.nat_gateway_ids = natgw_ids
+        raise group
+    return natgw_ids
+
+
 if __name__ == "__main__":
     profile_name = "default" # Replace with your AWS profile name
     workspace_id = "1018030004293411"   # Replace with your Databricks workspace ID
     region_name = "ap-south-1"           # Specify the AWS region
     creator = CreateNATGateway(profile_name, workspace_id, region_name)
     natgw_id = creator.run()
-    print(f"NAT Gateway created with ID: {natgw_id}")
+    logger.info("NAT Gateway created with ID: %s", natgw_id)
 
 
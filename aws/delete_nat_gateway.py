@@ -1,76 +1,14 @@
-import boto3
 import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from botocore.exceptions import ClientError
+
+from ._natgw_base import BULK_MAX_WORKERS, ToggleNATGatewayForDatabricksWorkspaceTrait
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-class ToggleNATGatewayForDatabricksWorkspaceTrait:
-    """
-    Base class for managing NAT Gateway operations in a Databricks workspace VPC.
-    Handles initialization of AWS client and finding necessary AWS resources.
-    """
-    def __init__(self, profile_name: str, workspace_id: str, region_name: str = 'eu-central-1'):
-        """
-        Initialize the trait with AWS credentials and Databricks workspace information.
-        """
-        self.client = boto3.Session(profile_name=profile_name).client('ec2', region_name=region_name)
-        self.vpc_id = self._find_vpc_id_by_name(workspace_id)
-        self.route_table = self._find_default_route_table_by_vpcid(self.vpc_id)
-        self.subnet_id_for_natgw = self._find_subnet_id_for_natgw_by_vpc_id(self.vpc_id)
-
-    def _find_vpc_id_by_name(self, workspace_id: str):
-        """
-        Find the VPC ID associated with the Databricks workspace.
-        """
-        response = self.client.describe_vpcs()
-        vpcs = response['Vpcs']
-        vpc_list = []
-        
-        for vpc in vpcs:
-            tags = vpc.get('Tags', [])
-            for tag in tags:
-                if tag['Key'] == 'Name' and f'workerenv-{workspace_id}' in tag['Value']:
-                    vpc_list.append(vpc['VpcId'])
-        
-        if len(vpc_list) == 1:
-            return vpc_list[0]
-        elif len(vpc_list) > 1:
-            raise ValueError(f"{len(vpc_list)} VPCs found with name containing workspace ID '{workspace_id}'")
-        else:
-            raise ValueError(f"No VPC found with name containing workspace ID '{workspace_id}'")
-
-    def _find_default_route_table_by_vpcid(self, vpc_id: str) -> str:
-        """
-        Find the default route table for the given VPC.
-        """
-        filter = [
-            {"Name": "vpc-id", "Values": [vpc_id]},
-            {"Name": "association.main", "Values": ["true"]},
-        ]
-        response = self.client.describe_route_tables(Filters=filter)
-        return response["RouteTables"][0]["RouteTableId"]
-
-    def _find_subnet_id_for_natgw_by_vpc_id(self, vpc_id: str) -> str:
-        """
-        Find the subnet designated for NAT Gateway in the VPC.
-        """
-        filter = [
-            {"Name": "vpc-id", "Values": [vpc_id]},
-        ]
-        response = self.client.describe_subnets(Filters=filter)
-        matched_subnets = []
-
-        for subnet in response['Subnets']:
-            for tag in subnet.get('Tags', []):
-                if tag['Key'] == 'Name' and 'nat-gateway-subnet' in tag['Value']:
-                    matched_subnets.append(subnet)
-
-        if (cnt := len(matched_subnets)) != 1:
-            raise ValueError(f"{cnt} subnets found with name 'nat-gateway-subnet' in VPC '{vpc_id}'")
-
-        return matched_subnets[0]['SubnetId']
-
 
 class DeleteNATGateway(ToggleNATGatewayForDatabricksWorkspaceTrait):
     """
@@ -82,12 +20,11 @@ class DeleteNATGateway(ToggleNATGatewayForDatabricksWorkspaceTrait):
         Initialize the NAT Gateway deleter.
         """
         super().__init__(profile_name, workspace_id, region_name)
-        self.natgw_id = self._find_natgw_id_by_subnet_id()
-        self.eip_association_id = self._find_eip_association_id_by_natgw_id()
+        self.natgw_id, self.eip_association_id = self._load_natgw_info()
 
-    def _find_natgw_id_by_subnet_id(self) -> str:
+    def _load_natgw_info(self) -> tuple[str, str]:
         """
-        Find the NAT Gateway ID associated with the subnet.
+        Find the NAT Gateway in the subnet and the Elastic IP allocation ID attached to it.
         """
         filter = [
             {"Name": "subnet-id", "Values": [self.subnet_id_for_natgw]},
@@ -96,19 +33,8 @@ class DeleteNATGateway(ToggleNATGatewayForDatabricksWorkspaceTrait):
         response = self.client.describe_nat_gateways(Filters=filter)
         if (cnt := len(response['NatGateways'])) != 1:
             raise ValueError(f"{cnt} NatGateways found in subnet '{self.subnet_id_for_natgw}'")
-        return response['NatGateways'][0]['NatGatewayId']
-
-    def _find_eip_association_id_by_natgw_id(self) -> str:
-        """
-        Find the Elastic IP association ID for the NAT Gateway.
-        """
-        filter = [
-            {"Name": "nat-gateway-id", "Values": [self.natgw_id]},
-        ]
-        response = self.client.describe_nat_gateways(Filters=filter)
-        if (cnt := len(response['NatGateways'])) != 1:
-            raise ValueError(f"{cnt} NatGateways found in subnet '{self.subnet_id_for_natgw}'")
-        return response['NatGateways'][0]['NatGatewayAddresses'][0]['AllocationId']
+        nat_gateway = response['NatGateways'][0]
+        return nat_gateway['NatGatewayId'], nat_gateway['NatGatewayAddresses'][0]['AllocationId']
 
     def delete_route_to_natgw(self):
         """
@@ -116,74 +42,109 @@ class DeleteNATGateway(ToggleNATGatewayForDatabricksWorkspaceTrait):
         Logs success or warning if no route is found.
         """
         try:
-            response = self.client.describe_route_tables(RouteTableIds=[self.route_table])
-            routes = response['RouteTables'][0]['Routes']
-            if any(route.get('DestinationCidrBlock') == '0.0.0.0/0' for route in routes):
-                self.client.delete_route(
-                    DestinationCidrBlock='0.0.0.0/0',
-                    RouteTableId=self.route_table
-                )
-                logger.info(f"Route to NAT Gateway on {self.route_table} deleted successfully")
-            else:
+            self.client.delete_route(
+                DestinationCidrBlock='0.0.0.0/0',
+                RouteTableId=self.route_table
+            )
+            logger.info("Route to NAT Gateway on %s deleted successfully", self.route_table)
+        except ClientError as e:
+            if 'InvalidRoute.NotFound' in str(e):
                 logger.warning("No route with destination 0.0.0.0/0 found in route table.")
-        except Exception as e:
-            logger.error(f"Error deleting route to NAT Gateway: {e}")
+            else:
+                logger.error("Error deleting route to NAT Gateway: %s", e)
 
     def delete_natgw(self):
         """
         Delete the NAT Gateway and wait for deletion to complete.
         """
-        response = self.client.delete_nat_gateway(
-            NatGatewayId=self.natgw_id
-        )
-        if response['ResponseMetadata']['HTTPStatusCode'] == 200:
-            logger.info(f"NAT Gateway {self.natgw_id} is deleting...")
-            waiter = self.client.get_waiter('nat_gateway_deleted')
-            waiter.wait(NatGatewayIds=[self.natgw_id])
-            logger.info(f"NAT Gateway {self.natgw_id} deleted successfully")
-        else:
-            raise ValueError(f"Failed to delete NAT Gateway {self.natgw_id}\n{response}")
+        try:
+            self.client.delete_nat_gateway(
+                NatGatewayId=self.natgw_id
+            )
+        except ClientError as e:
+            raise ValueError(f"Failed to delete NAT Gateway {self.natgw_id}: {e}") from e
+        logger.info("NAT Gateway %s is deleting...", self.natgw_id)
+        waiter = self.client.get_waiter('nat_gateway_deleted')
+        waiter.wait(NatGatewayIds=[self.natgw_id])
+        logger.info("NAT Gateway %s deleted successfully", self.natgw_id)
 
     def release_eip(self):
         """
         Release the Elastic IP associated with the NAT Gateway.
         """
-        response = self.client.release_address(
-            AllocationId=self.eip_association_id
-        )
-        if response['ResponseMetadata']['HTTPStatusCode'] == 200:
-            logger.info(f"Elastic IP {self.eip_association_id} released successfully")
-        else:
-            raise ValueError(f"Failed to release Elastic IP {self.eip_association_id}\n{response}")
+        try:
+            self.client.release_address(
+                AllocationId=self.eip_association_id
+            )
+        except ClientError as e:
+            raise ValueError(f"Failed to release Elastic IP {self.eip_association_id}: {e}") from e
+        logger.info("Elastic IP %s released successfully", self.eip_association_id)
 
     def check_routes_in_route_table(self):
         """
         Log all routes in the route table for debugging purposes.
-        Logs destination CIDR blocks and their targets.
+        Logs destination CIDR blocks and their targets; skipped unless DEBUG logging is enabled.
         """
+        if not logger.isEnabledFor(logging.DEBUG):
+            return
         try:
             response = self.client.describe_route_tables(RouteTableIds=[self.route_table])
             for route in response['RouteTables'][0]['Routes']:
                 destination = route.get('DestinationCidrBlock', 'N/A')
                 target = route.get('NatGatewayId', 'None')
-                logger.info(f"Destination: {destination}, Target: {target}")
+                logger.debug("Destination: %s, Target: %s", destination, target)
         except Exception as e:
-            logger.error(f"Error retrieving routes in route table: {e}")
+            logger.error("Error retrieving routes in route table: %s", e)
     
     def run(self):
         """
         Execute the complete NAT Gateway deletion workflow:
-        1. Check current routes in route table
+        1. Check current routes in route table (DEBUG logging only)
         2. Delete route to NAT Gateway
         3. Delete the NAT Gateway
         4. Release the associated Elastic IP
         """
-        self.check_routes_in_route_table()  
+        self.check_routes_in_route_table()
         self.delete_route_to_natgw()  
         self.delete_natgw() 
         self.release_eip() 
 
 
+def delete_nat_gateways(profile_name: str, workspace_ids: list[str], region_name: str = 'eu-central-1',
+                        max_workers: int = 8) -> list[str]:
+    """
+    Delete the NAT Gateways of several Databricks workspaces concurrently; duplicate IDs are only run once.
+    Returns the workspace IDs whose NAT Gateways were deleted. Every workspace is
+    attempted; if any fail, an ExceptionGroup is raised once all runs have finished, with
+    the successfully deleted workspace IDs attached as `deleted_workspace_ids`.
+    `max_workers` is capped at BULK_MAX_WORKERS, the concurrency the shared EC2 client's
+    connection pool is sized for.
+    """
+    def run_for(workspace_id: str):
+        DeleteNATGateway(profile_name, workspace_id, region_name).run()
+
+    # Two concurrent deletions of the same workspace would race each other
+    workspace_ids = list(dict.fromkeys(workspace_ids))
+    deleted, errors = set(), []
+    with ThreadPoolExecutor(max_workers=min(max_workers, BULK_MAX_WORKERS)) as executor:
+        futures = {executor.submit(run_for, workspace_id): workspace_id for workspace_id in workspace_ids}
+        for future in as_completed(futures):
+            workspace_id = futures[future]
+            try:
+                future.result()
+                deleted.add(workspace_id)
+            except Exception as e:
+                e.add_note(f"Workspace ID: {workspace_id}")
+                errors.append(e)
+
+    deleted_workspace_ids = [workspace_id for workspace_id in workspace_ids if workspace_id in deleted]
+    if errors:
+        group = ExceptionGroup(f"Failed to delete NAT Gateways for {len(errors)} of {len(workspace_ids)} workspaces", errors)
+        group.deleted_workspace_ids = deleted_workspace_ids
+        raise group
+    return deleted_workspace_ids
+
+
 if __name__ == "__main__":
     profile_name = "default" # Replace with your AWS profile name
     workspace_id = "1018030004293411"   # Replace with your Databricks workspace ID
@@ -0,0 +1,66 @@
+import boto3
+import pytest
+from moto import mock_aws
+
+from aws import _natgw_base
+
+REGION = 'eu-central-1'
+PROFILE = 'default'
+
+
+@pytest.fixture(autouse=True)
+def aws_credentials(tmp_path, monkeypatch):
+    """
+    Point boto3 at a throwaway profile so tests never touch real AWS config or credentials.
+    """
+    config = tmp_path / 'config'
+    config.write_text(f"[default]\nregion = {REGION}\n")
+    monkeypatch.setenv('AWS_CONFIG_FILE', str(config))
+    credentials = tmp_path / 'credentials'
+    credentials.write_text("[default]\naws_access_key_id = testing\naws_secret_access_key = testing\n")
+    monkeypatch.setenv('AWS_SHARED_CREDENTIALS_FILE', str(credentials))
+    _natgw_base.ec2_client.cache_clear()
+    _natgw_base._lookup_cache.clear()
+    yield
+    _natgw_base.ec2_client.cache_clear()
+    _natgw_base._lookup_cache.clear()
+
+
+@pytest.fixture
+def ec2():
+    """
+    A mocked EC2 client for arranging and inspecting workspace resources.
+    """
+    with mock_aws():
+        yield boto3.client('ec2', region_name=REGION)
+
+
+def create_workspace_vpc(ec2, workspace_id: str, cidr: str = '10.0.0.0/16') -> dict:
+    """
+    Create a Databricks-style workspace VPC with a tagged NAT Gateway subnet.
+    The main route table has no 0.0.0.0/0 route, like a workspace whose NAT Gateway was deleted.
+    """
+    vpc_id = ec2.create_vpc(
+        CidrBlock=cidr,
+        TagSpecifications=[{'ResourceType': 'vpc', 'Tags': [{'Key': 'Name', 'Value': f'workerenv-{workspace_id}-vpc'}]}],
+    )['Vpc']['VpcId']
+    subnet_id = ec2.create_subnet(
+        VpcId=vpc_id,
+        CidrBlock=cidr.replace('.0.0/16', '.1.0/24'),
+        TagSpecifications=[{'ResourceType': 'subnet', 'Tags': [
+            {'Key': 'Name', 'Value': f'workerenv-{workspace_id}-nat-gateway-subnet'},
+        ]}],
+    )['Subnet']['SubnetId']
+    route_table_id = ec2.describe_route_tables(Filters=[
+        {'Name': 'vpc-id', 'Values': [vpc_id]},
+        {'Name': 'association.main', 'Values': ['true']},
+    ])['RouteTables'][0]['RouteTableId']
+    return {'vpc_id': vpc_id, 'subnet_id': subnet_id, 'route_table_id': route_table_id}
+
+
+def default_route(ec2, route_table_id: str) -> dict | None:
+    """
+    Return the 0.0.0.0/0 route of the route table, if any.
+    """
+    routes = ec2.describe_route_tables(RouteTableIds=[route_table_id])['RouteTables'][0]['Routes']
+    return next((route for route in routes if route.get('DestinationCidrBlock') == '0.0.0.0/0'), None)
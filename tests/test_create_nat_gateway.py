@@ -0,0 +1,107 @@
+import pytest
+
+from aws import create_nat_gateway
+from aws.create_nat_gateway import CreateNATGateway, create_nat_gateways
+
+from .conftest import PROFILE, REGION, create_workspace_vpc, default_route
+
+
+def test_run_creates_default_route_when_route_table_has_none(ec2):
+    workspace = create_workspace_vpc(ec2, '123')
+    assert default_route(ec2, workspace['route_table_id']) is None
+
+    natgw_id = CreateNATGateway(PROFILE, '123', REGION).run()
+
+    assert default_route(ec2, workspace['route_table_id'])['NatGatewayId'] == natgw_id
+
+
+def test_run_replaces_existing_default_route(ec2):
+    workspace = create_workspace_vpc(ec2, '123')
+    igw_id = ec2.create_internet_gateway()['InternetGateway']['InternetGatewayId']
+    ec2.attach_internet_gateway(InternetGatewayId=igw_id, VpcId=workspace['vpc_id'])
+    ec2.create_route(RouteTableId=workspace['route_table_id'], DestinationCidrBlock='0.0.0.0/0', GatewayId=igw_id)
+
+    natgw_id = CreateNATGateway(PROFILE, '123', REGION).run()
+
+    assert default_route(ec2, workspace['route_table_id'])['NatGatewayId'] == natgw_id
+
+
+def test_create_nat_gateways_reports_partial_results_and_skips_duplicates(ec2):
+    create_workspace_vpc(ec2, '123', '10.0.0.0/16')
+    create_workspace_vpc(ec2, '999', '10.1.0.0/16')
+
+    with pytest.raises(ExceptionGroup) as excinfo:
+        create_nat_gateways(PROFILE, ['123', '999', '123', '404'], REGION)
+
+    group = excinfo.value
+    assert str(group).startswith("Failed to create NAT Gateways for 1 of 3 workspaces")
+    assert [str(e) for e in group.exceptions] == ["No VPCs found with name containing workspace ID '404'"]
+    assert group.exceptions[0].__notes__ == ["Workspace ID: 404"]
+    assert list(group.nat_gateway_ids) == ['123', '999']
+    nat_gateways = ec2.describe_nat_gateways()['NatGateways']
+    assert sorted(ng['NatGatewayId'] for ng in nat_gateways) == sorted(group.nat_gateway_ids.values())
+
+
+def test_create_nat_gateways_returns_ids_in_input_order(ec2):
+    create_workspace_vpc(ec2, '123', '10.0.0.0/16')
+    create_workspace_vpc(ec2, '999', '10.1.0.0/16')
+
+    natgw_ids = create_nat_gateways(PROFILE, ['999', '123'], REGION)
+
+    assert list(natgw_ids) == ['999', '123']
+
+
+class FakeNatGatewayClient:
+    def __init__(self, states):
+        self.states = iter(states)
+
+    def describe_nat_gateways(self, NatGatewayIds):
+        return {'NatGateways': [{'NatGatewayId': NatGatewayIds[0], 'State': next(self.states)}]}
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """
+    Replace time.sleep with a recorder that advances a fake time.monotonic clock.
+    """
+    sleeps, clock = [], [0.0]
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        clock[0] += seconds
+
+    monkeypatch.setattr(create_nat_gateway.time, 'sleep', sleep)
+    monkeypatch.setattr(create_nat_gateway.time, 'monotonic', lambda: clock[0])
+    return sleeps
+
+
+def creator_with_states(states) -> CreateNATGateway:
+    creator = CreateNATGateway.__new__(CreateNATGateway)
+    creator.client = FakeNatGatewayClient(states)
+    return creator
+
+
+def test_check_nat_gateway_status_backs_off_linearly_then_exponentially(sleeps):
+    creator = creator_with_states(['pending'] * 13 + ['available'])
+
+    creator.check_nat_gateway_status('nat-1', timeout=3600)
+
+    assert sleeps == [1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 20, 30, 30]
+
+
+def test_check_nat_gateway_status_gives_up_at_deadline(sleeps):
+    creator = creator_with_states(['pending'] * 100)
+
+    with pytest.raises(ValueError, match="did not become available within 15 seconds"):
+        creator.check_nat_gateway_status('nat-1', timeout=15)
+
+    assert sleeps == [1, 2, 3, 4, 5]
+
+
+def test_check_nat_gateway_status_rejects_unexpected_state(sleeps):
+    creator = creator_with_states(['failed'])
+
+    with pytest.raises(ValueError, match="unexpected state: failed"):
+        creator.check_nat_gateway_status('nat-1')
+
+    assert sleeps == []
@@ -0,0 +1,30 @@
+import pytest
+
+from aws.create_nat_gateway import CreateNATGateway
+from aws.delete_nat_gateway import delete_nat_gateways
+
+from .conftest import PROFILE, REGION, create_workspace_vpc, default_route
+
+
+def test_delete_nat_gateways_reports_partial_results_and_skips_duplicates(ec2):
+    workspace = create_workspace_vpc(ec2, '123')
+    natgw_id = CreateNATGateway(PROFILE, '123', REGION).run()
+
+    with pytest.raises(ExceptionGroup) as excinfo:
+        delete_nat_gateways(PROFILE, ['123', '404', '123'], REGION)
+
+    group = excinfo.value
+    assert str(group).startswith("Failed to delete NAT Gateways for 1 of 2 workspaces")
+    assert group.exceptions[0].__notes__ == ["Workspace ID: 404"]
+    assert group.deleted_workspace_ids == ['123']
+    nat_gateway = ec2.describe_nat_gateways(NatGatewayIds=[natgw_id])['NatGateways'][0]
+    assert nat_gateway['State'] == 'deleted'
+    assert default_route(ec2, workspace['route_table_id']) is None
+    assert ec2.describe_addresses()['Addresses'] == []
+
+
+def test_delete_nat_gateways_returns_deleted_workspace_ids(ec2):
+    create_workspace_vpc(ec2, '123')
+    CreateNATGateway(PROFILE, '123', REGION).run()
+
+    assert delete_nat_gateways(PROFILE, ['123'], REGION) == ['123']
@@ -0,0 +1,75 @@
+import pytest
+
+from aws import _natgw_base
+from aws._natgw_base import LOOKUP_CACHE_TTL_SECONDS, ToggleNATGatewayForDatabricksWorkspaceTrait, _cached_lookup
+
+from .conftest import PROFILE, REGION, create_workspace_vpc
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(_natgw_base.time, 'monotonic', clock)
+    return clock
+
+
+def test_cached_lookup_reuses_id_within_ttl(clock):
+    calls = []
+
+    def lookup():
+        calls.append(clock.now)
+        return 'vpc-1'
+
+    assert _cached_lookup(('key',), lookup) == 'vpc-1'
+    clock.now += LOOKUP_CACHE_TTL_SECONDS - 1
+    assert _cached_lookup(('key',), lookup) == 'vpc-1'
+    assert len(calls) == 1
+
+
+def test_cached_lookup_refreshes_expired_id(clock):
+    ids = iter(['vpc-1', 'vpc-2'])
+    assert _cached_lookup(('key',), lambda: next(ids)) == 'vpc-1'
+    clock.now += LOOKUP_CACHE_TTL_SECONDS
+    assert _cached_lookup(('key',), lambda: next(ids)) == 'vpc-2'
+
+
+def test_cached_lookup_does_not_cache_failures(clock):
+    calls = []
+
+    def lookup():
+        calls.append(clock.now)
+        if len(calls) == 1:
+            raise ValueError("No VPCs found")
+        return 'vpc-1'
+
+    with pytest.raises(ValueError):
+        _cached_lookup(('key',), lookup)
+    assert _cached_lookup(('key',), lookup) == 'vpc-1'
+    assert len(calls) == 2
+
+
+def test_cached_lookup_evicts_expired_entries(clock):
+    _cached_lookup(('old',), lambda: 'vpc-old')
+    clock.now += LOOKUP_CACHE_TTL_SECONDS
+    _cached_lookup(('new',), lambda: 'vpc-new')
+    assert list(_natgw_base._lookup_cache) == [('new',)]
+
+
+def test_missing_workspace_vpc_can_be_retried_once_it_exists(ec2):
+    with pytest.raises(ValueError, match="No VPCs found"):
+        ToggleNATGatewayForDatabricksWorkspaceTrait(PROFILE, '123', REGION)
+
+    workspace = create_workspace_vpc(ec2, '123')
+    trait = ToggleNATGatewayForDatabricksWorkspaceTrait(PROFILE, '123', REGION)
+
+    assert trait.vpc_id == workspace['vpc_id']
+    assert trait.route_table == workspace['route_table_id']
+    assert trait.subnet_id_for_natgw == workspace['subnet_id']